@@ -49,6 +49,8 @@ class Pub(publication.Pub):
     Initially (and probably forever) the original definition of CUL pubs
     comes from a CUL JSON export of the whole library.
     """
+    __slots__ = ("_cul_json", "cul_id")
+
     def __init__(self, cul_json):
         """Create a CiteULike publication object from CUL JSON."""
 
@@ -92,7 +94,11 @@ class Pub(publication.Pub):
             self.canonical_journal = None
 
         # Entry date in CUL JSON looks like "date": "2016-12-22 00:18:58"
-        self.entry_date = self._cul_json.get("date")[0:10]
+        self.entry_date = publication.to_entry_date(
+            self._cul_json.get("date"))
+        if not self.entry_date:
+            print("Warning: CUL Pub '{0}'".format(self.title), file=sys.stderr)
+            print("  Does not have a valid date.\n", file=sys.stderr)
 
         return None
 
@@ -146,9 +152,7 @@ class PubLibrary(publication.PubLibrary):
         cul_file = open(cul_json_lib_path, "r")
         cul_json = json.load(cul_file)  # read it all at once.
 
-        for cul_pub_json in cul_json:
-            cul_pub = Pub(cul_pub_json)
-            self.add_pub(cul_pub)
+        self.add_pubs([Pub(cul_pub_json) for cul_pub_json in cul_json])
 
         cul_file.close()
         self.num_pubs = len(self._by_canonical_title)
@@ -123,46 +123,48 @@ class AlertSource(alert.AlertSource):
         Senders is an array because providers change the sending email
         address sometimes.  Using all known email addresses, instead of
         just the latest one, allows us to scan as far back as we can.
+
+        All senders are searched for in a single IMAP search, rather than
+        one search per sender.
         """
 
         # Get each email / alert
         self._current_email_alerts = []  # TODO: May not need this.
         self._current_pub_alerts = []
 
-        for sender in senders:
-            search_string = _build_imap_search_string(sender, since, before)
-            self._connection.select(mailbox, True)
-            typ, self._msg_nums = self._connection.uid(
-                'search', None, search_string)
-
-            # _msg_nums is a list of email numbers
-            for msg_num in self._msg_nums[0].split():
-                typ, header = self._connection.uid(
-                    "fetch", msg_num, HEADER_PARTS)
-                typ, body = self._connection.uid("fetch", msg_num, BODY_PARTS)
-                email = Email(header, body)
-                # Email alerts can have different versions.
-                # Detect which version this is and then invoke the correct
-                # constructor for the version.
-                alert_class = self.module.sniff_class_for_alert(email)
-                email_alert = alert_class(email)
-                # email_alert = self.module.EmailAlert(email)
-                self._current_email_alerts.append(email_alert)
-
-                # Within each email / alert, generate a pub_alert for each pub.
-                # each email can contain 0, 1, or more pub_alerts
-                pub_alerts_in_email = len(email_alert.pub_alerts)
-                if pub_alerts_in_email:
-                    self._current_pub_alerts += email_alert.pub_alerts
-                elif email_alert.warn_if_empty:
-                    print("Warning: Alert for search", file=sys.stderr)
-                    print(
-                        "  '" + email_alert.search + "'",
-                        file=sys.stderr)
-                    print(
-                        "  from source '" + self.module.SOURCE_NAME_TEXT
-                        + "' does not contain any papers.\n",
-                        file=sys.stderr)
+        search_string = _build_imap_search_string(senders, since, before)
+        self._connection.select(mailbox, True)
+        typ, self._msg_nums = self._connection.uid(
+            'search', None, search_string)
+
+        # _msg_nums is a list of email numbers
+        for msg_num in self._msg_nums[0].split():
+            typ, header = self._connection.uid(
+                "fetch", msg_num, HEADER_PARTS)
+            typ, body = self._connection.uid("fetch", msg_num, BODY_PARTS)
+            email = Email(header, body)
+            # Email alerts can have different versions.
+            # Detect which version this is and then invoke the correct
+            # constructor for the version.
+            alert_class = self.module.sniff_class_for_alert(email)
+            email_alert = alert_class(email)
+            # email_alert = self.module.EmailAlert(email)
+            self._current_email_alerts.append(email_alert)
+
+            # Within each email / alert, generate a pub_alert for each pub.
+            # each email can contain 0, 1, or more pub_alerts
+            pub_alerts_in_email = len(email_alert.pub_alerts)
+            if pub_alerts_in_email:
+                self._current_pub_alerts += email_alert.pub_alerts
+            elif email_alert.warn_if_empty:
+                print("Warning: Alert for search", file=sys.stderr)
+                print(
+                    "  '" + email_alert.search + "'",
+                    file=sys.stderr)
+                print(
+                    "  from source '" + self.module.SOURCE_NAME_TEXT
+                    + "' does not contain any papers.\n",
+                    file=sys.stderr)
 
         if len(self._msg_nums) == 0:
             print(
@@ -173,19 +175,26 @@ class AlertSource(alert.AlertSource):
 
 
 def _build_imap_search_string(
-        sender=None,
+        senders=None,
         sentSince=None,
         sentBefore=None):
     """Builds an IMAP search string from the given inputs.  At least one
     search parameter must be provided.
+
+    senders is a list of sender addresses.  Mail from any of them matches.
     """
     clauses = []
     if sentSince:
         clauses.append('SENTSINCE ' + sentSince)
     if sentBefore:
         clauses.append('SENTBEFORE ' + sentBefore)
-    if sender:
-        clauses.append('From "' + sender + '"')
+    if senders:
+        # IMAP OR takes exactly two keys, so chain them:
+        #   OR From "a" OR From "b" From "c"
+        from_clause = 'From "' + senders[-1] + '"'
+        for sender in reversed(senders[:-1]):
+            from_clause = 'OR From "' + sender + '" ' + from_clause
+        clauses.append(from_clause)
 
     if len(clauses) == 0:
         raise AssertionError(
@@ -5,6 +5,7 @@ import argparse
 import collections
 
 import lib_types
+import publication
 import report_formats
 
 
@@ -119,6 +120,15 @@ def gen_pubs_date_range_report(
 
 
 
+def parse_entry_date(date_text):
+    """Parse an --entrystartdate or --entryenddate argument into a date."""
+    entry_date = publication.to_entry_date(date_text)
+    if not entry_date:
+        raise argparse.ArgumentTypeError(
+            "'{0}' is not a YYYY-MM-DD date.".format(date_text))
+    return entry_date
+
+
 def get_args():
     """
     Parse command line arguments.
@@ -170,12 +180,12 @@ def get_args():
             + "--entryenddate parameters are required if --tagcountdaterange "
             + "is specified."))
     arg_parser.add_argument(
-        "--entrystartdate", required=False,
+        "--entrystartdate", required=False, type=parse_entry_date,
         help=(
             "--tagcountdaterange will report on papers with entry dates "
             + "greater than or equal to this date. Example: 2016-12-29"))
     arg_parser.add_argument(
-        "--entryenddate", required=False,
+        "--entryenddate", required=False, type=parse_entry_date,
         help=(
             "--tagcountdaterange will report on papers with entry dates "
             + "less than or equal to this date. Example: 2017-01-29"))
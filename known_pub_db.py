@@ -7,7 +7,11 @@ of pubs, previous alerts, or a previous version of a known pub database.  They
 are typicallly created when processing new alerts.
 """
 
+import argparse
+import collections
 import csv
+import importlib.util
+import operator
 import sys
 
 import cul_pub
@@ -23,6 +27,21 @@ STATE_EXCLUDE = "exclude"     # Pub reported by an exclude aler, meaning, it
 # This state should never get wriiten out. Exists only in memory.
 STATE_DONT_KNOW_YET = "dont-know-yet"
 
+# Sections of a written DB, in the order they are written.
+SECTION_ACTIVE = "active"     # Still needs curation
+SECTION_PAST = "past"         # Curation is done
+SECTION_BIZARRE = "bizarre"   # Unknown state. Shouldn't happen.
+SECTION_ORDER = [SECTION_ACTIVE, SECTION_PAST, SECTION_BIZARRE]
+
+# Which section each state is written in.  Anything else is bizarre.
+STATE_SECTIONS = {
+    STATE_NEW: SECTION_ACTIVE,
+    STATE_WAIT: SECTION_ACTIVE,
+    STATE_EXCLUDE: SECTION_PAST,
+    STATE_IGNORE: SECTION_PAST,
+    STATE_INLIB: SECTION_PAST,
+    }
+
 
 # Columns
 TITLE = "title"
@@ -41,6 +60,17 @@ COLUMNS = [
     QUALIFIER,                            # Secondary comment / reason
     ]
 
+# Every canonical (and lower case) DOI starts with this.
+CANONICAL_DOI_PREFIX = "10."
+
+# Known pub DBs are read and written in one pass.  Use a big buffer.
+TSV_BUFFER_SIZE = 1 << 20
+
+# Known pub DBs are stored in TSV format, unless the file name ends with
+# this, in which case they are stored in Parquet format.  Parquet support
+# requires pyarrow.
+PARQUET_EXTENSION = ".parquet"
+
 
 class KnownPubDBEntry(object):
     """A single entry in a known pubs database."""
@@ -55,6 +85,7 @@ class KnownPubDBEntry(object):
         if self._row:
             self._canonical_title = publication.to_canonical(self._row[TITLE])
             self.set_doi(self._row[DOI])  # make sure it's in canonical form
+            self.set_state(self._row[STATE])  # intern it
         else:
             self._row = {}
             self.set_title(None)  # also sets _canonical_title
@@ -85,7 +116,11 @@ class KnownPubDBEntry(object):
         return self._row[AUTHORS]
 
     def set_doi(self, doi):
-        self._row[DOI] = publication.to_canonical_doi(doi)
+        # DOIs read from a DB are almost always canonical already.
+        if doi and doi.startswith(CANONICAL_DOI_PREFIX) and doi.islower():
+            self._row[DOI] = doi
+        else:
+            self._row[DOI] = publication.to_canonical_doi(doi)
         return None
 
     def get_doi(self):
@@ -95,6 +130,10 @@ class KnownPubDBEntry(object):
         return doi
 
     def set_state(self, state):
+        # There are only a handful of states, and they are compared a lot.
+        # Interning them lets those comparisons short circuit on identity.
+        if state is not None:
+            state = sys.intern(state)
         self._row[STATE] = state
         return None
 
@@ -141,14 +180,35 @@ class KnownPubDB(object):
         self.by_canonical_title = {}
         self.by_canonical_doi = {}
         if known_pubs_file_path:
-            tsv_in = open(known_pubs_file_path, "r")
+            if is_parquet_path(known_pubs_file_path):
+                self.read_parquet(known_pubs_file_path)
+            else:
+                self.read_tsv(known_pubs_file_path)
+
+        return None
+
+    def read_tsv(self, tsv_path):
+        """Add every entry in the given TSV known pubs file to the DB."""
+        with open(
+                tsv_path, "r", newline="",
+                buffering=TSV_BUFFER_SIZE) as tsv_in:
             tsv_reader = csv.DictReader(
                 tsv_in, dialect="excel-tab")  # fieldnames=COLUMNS
             for row in tsv_reader:
                 db_entry = KnownPubDBEntry(row)
                 self.add_known_pub(db_entry)
 
-            tsv_in.close()
+        return None
+
+    def read_parquet(self, parquet_path):
+        """Add every entry in the given Parquet known pubs file to the DB."""
+        import pyarrow.parquet
+
+        table = pyarrow.parquet.read_table(
+            parquet_path, columns=COLUMNS, memory_map=True)
+        for row in table.to_pylist():
+            db_entry = KnownPubDBEntry(row)
+            self.add_known_pub(db_entry)
 
         return None
 
@@ -198,30 +258,22 @@ class KnownPubDB(object):
     def write_db_to_file(self, out_db_path):
         """Given a path to write the DB to, write it out.
 
-        This method writes the DB to a TSV file with this format:
+        This method writes the DB to a TSV file (or a Parquet file, if the
+        path ends in PARQUET_EXTENSION) with this format:
         1) Entries that are new and wiating are listed first, in alphabetical
            order of canonical title
         # 2) A separator is written  NO IT'S NOT.
         3) Everything else is written out.
         """
-        db_out = open(out_db_path, "w")
-        db_writer = csv.DictWriter(
-            db_out, fieldnames=COLUMNS, dialect="excel-tab")
-        db_writer.writeheader()
-
-        # walk through library, sorting into two groups, based on state
-        active_entries = []
-        exclude_entries = []
-        past_entries = []
-        bizarre_entries = []
+        # walk through library, sorting into sections, based on state.
+        # Each section holds (canonical title, row) pairs, so writing only
+        # has to touch the rows, not the entries.
+        sections = collections.defaultdict(list)
 
         for entry in self.by_canonical_title.values():
             entry_state = entry.get_state()
-            if entry_state in [STATE_NEW, STATE_WAIT]:
-                active_entries.append(entry)
-            elif entry_state in [STATE_EXCLUDE, STATE_IGNORE, STATE_INLIB]:
-                past_entries.append(entry)
-            else:
+            section = STATE_SECTIONS.get(entry_state, SECTION_BIZARRE)
+            if section is SECTION_BIZARRE:
                 print(
                     ("Warning: Entry with unkown state '{0}' "
                      + "written to DB.").format(entry_state),
@@ -230,13 +282,103 @@ class KnownPubDB(object):
                     "  Title: {0}".format(entry.get_title()),
                     file=sys.stderr)
                 print("", file=sys.stderr)
-                bizarre_entries.append(entry)
+            sections[section].append(
+                (entry.get_canonical_title(), entry._row))
 
         # separator_entry = KnownPubDBEntry.gen_separator_entry()
-        for entry_list in [active_entries, past_entries, bizarre_entries]:
-            entry_list.sort(key=lambda entry: entry.get_canonical_title())
-            for entry in entry_list:
-                db_writer.writerow(entry._row)
-            # db_writer.writerow(separator_entry._row)
+        entry_lists = [sections[section] for section in SECTION_ORDER]
+        for entry_list in entry_lists:
+            entry_list.sort(key=operator.itemgetter(0))
+        rows = (row for entry_list in entry_lists for _, row in entry_list)
+
+        if is_parquet_path(out_db_path):
+            self.write_parquet(out_db_path, rows)
+        else:
+            self.write_tsv(out_db_path, rows)
+
+        return None
+
+    def write_tsv(self, tsv_path, rows):
+        """Write the given rows, in order, to a TSV known pubs file."""
+        with open(
+                tsv_path, "w", newline="",
+                buffering=TSV_BUFFER_SIZE) as db_out:
+            db_writer = csv.DictWriter(
+                db_out, fieldnames=COLUMNS, dialect="excel-tab")
+            db_writer.writeheader()
+            db_writer.writerows(rows)
 
         return None
+
+    def write_parquet(self, parquet_path, rows):
+        """Write the given rows, in order, to a Parquet known pubs file.
+
+        Missing values are written as empty strings, just as they are in TSV.
+        The state column only has a handful of values, so it is dictionary
+        encoded.
+        """
+        import pyarrow
+        import pyarrow.parquet
+
+        columns = {column: [] for column in COLUMNS}
+        for row in rows:
+            for column in COLUMNS:
+                columns[column].append(row.get(column) or "")
+
+        arrays = {
+            column: pyarrow.array(values, type=pyarrow.string())
+            for column, values in columns.items()}
+        arrays[STATE] = arrays[STATE].dictionary_encode()
+        pyarrow.parquet.write_table(
+            pyarrow.Table.from_pydict(arrays), parquet_path)
+
+        return None
+
+
+def is_parquet_path(known_pubs_file_path):
+    """Return true if the given known pubs DB path is for a Parquet file."""
+    return known_pubs_file_path.lower().endswith(PARQUET_EXTENSION)
+
+
+def check_known_pubs_paths(args, arg_parser):
+    """Parquet known pubs DBs can only be used if pyarrow is installed.
+
+    Checked up front, so a long run doesn't fail when it finally writes
+    the DB out.
+    """
+    for path in [args.knownpubsin, args.knownpubsout]:
+        if (path and is_parquet_path(path)
+                and not importlib.util.find_spec("pyarrow")):
+            arg_parser.error(
+                ("Parquet known pubs DB {0} requires pyarrow to be "
+                 + "installed.").format(path))
+
+    return None
+
+
+def get_args():
+    """Parse and return the command line arguments."""
+    arg_parser = argparse.ArgumentParser(
+        description=(
+            "Copy a known pubs DB from one file to another, converting "
+            + "between TSV and Parquet formats. Each file is in Parquet "
+            + "format if its name ends in " + PARQUET_EXTENSION
+            + ", and in TSV format otherwise."))
+    arg_parser.add_argument(
+        "knownpubsin",
+        help="Path to the existing known pubs DB.")
+    arg_parser.add_argument(
+        "knownpubsout",
+        help="Where to write the converted known pubs DB.")
+
+    args = arg_parser.parse_args()
+    check_known_pubs_paths(args, arg_parser)
+
+    return args
+
+
+# MAIN
+if __name__ == '__main__':
+    command_line_args = get_args()
+    KnownPubDB(command_line_args.knownpubsin).write_db_to_file(
+        command_line_args.knownpubsout)
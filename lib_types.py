@@ -17,6 +17,12 @@ LIB_TYPE_MAPPING = {
 
 LIB_TYPES = list(LIB_TYPE_MAPPING.keys())
 
+# LIB_TYPES doesn't change, so build its text version once.
+if len(LIB_TYPES) > 1:
+    _LIB_TYPES_TEXT = ", ".join(LIB_TYPES[:-1]) + " and " + LIB_TYPES[-1]
+else:
+    _LIB_TYPES_TEXT = LIB_TYPES[0]
+
 
 def get_lib_module(lib_command_line_arg):
     """Given a command line argument specifying the publication library type,
@@ -26,11 +32,7 @@ def get_lib_module(lib_command_line_arg):
 
 
 def get_lib_types_as_text_list():
-    text_list = ""
-    for lib_type in LIB_TYPES[0:-1]:
-        text_list += lib_type + ", "
-    if text_list:
-        text_list += " and "
-    text_list += LIB_TYPES[-1]
-
-    return text_list
+    """Return the list of library types as a comma separated text string,
+    with an "and" between the last two items.
+    """
+    return _LIB_TYPES_TEXT
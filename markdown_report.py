@@ -5,8 +5,6 @@ Since there is a lot we can't directly in Markdown format, this module
 falls back on the html_report module when necessary.
 """
 
-import math
-
 import html_report
 
 
@@ -94,7 +92,7 @@ def gen_tag_count_date_range_report(tags_in_count_order, n_total_papers,
 
     # Have markup for individual tags; now decide how many go in each column
     n_tags_to_report = len(tag_markup)
-    n_tags_per_col = int(math.ceil(n_tags_to_report / num_tag_column_groups))
+    n_tags_per_col = -(-n_tags_to_report // num_tag_column_groups)
 
     report = []              # now have everything we need; generate report
 
@@ -6,6 +6,8 @@ The processed list is then used to help add pubs to the target library.
 """
 
 import argparse
+import datetime
+import itertools
 import urllib.parse
 
 import alert
@@ -24,6 +26,15 @@ PROXY_SEPARATOR_OPTIONS = {
     DASH_PROXY_OPTION: "-",
     }
 
+# --since and --before dates look like 01-Dec-2014.  That's what IMAP wants.
+ALERT_DATE_FORMAT = "%d-%b-%Y"
+
+# Translation tables that swap dots in a host name for the separator.
+PROXY_SEPARATOR_TRANSLATIONS = {
+    option: str.maketrans({".": separator})
+    for option, separator in PROXY_SEPARATOR_OPTIONS.items()
+    }
+
 
 # Globals
 args = None
@@ -67,15 +78,16 @@ def get_args():
             "Address of --email's IMAP server. For GMail this is "
             + "imap.gmail.com"))
     arg_parser.add_argument(
-        "--since", required=True,
+        "--since", required=True, type=parse_alert_date,
         help=("Only look at alerts from after this date."
               + " Format: DD-Mon-YYYY.  Example: 01-Dec-2014."))
     arg_parser.add_argument(
-        "--before", required=False,
+        "--before", required=False, type=parse_alert_date,
         help=("Optional. Only look at alerts before this date."
               + " Format: DD-Mon-YYYY.  Example: 01-Jan-2015."))
     arg_parser.add_argument(
-        # This is mapped to a list before returning to caller.
+        # parse_sources maps this to a frozenset (None for all) before
+        # returning to caller.
         "--sources", required=True,
         help="Which alert sources to process. Is either 'all' or a "
         + "comma-separated list (no spaces) from these sources: "
@@ -109,10 +121,13 @@ def get_args():
         "--knownpubsin", required=False,
         help=(
             "Read in curation history (likely) from previous run. Tells you "
-            + "what you've seen before."))
+            + "what you've seen before. Parquet format is used if the file "
+            + "name ends in .parquet, TSV otherwise."))
     arg_parser.add_argument(
         "--knownpubsout", required=False,
-        help="Create a history of this run in TSV format as well.")
+        help=(
+            "Create a history of this run in TSV format as well. Parquet "
+            + "format is used if the file name ends in .parquet."))
 
     arg_parser.add_argument(
         "--okduplicatetitles", required=False,
@@ -120,6 +135,13 @@ def get_args():
             "Text file containing duplicate titles that have been reviewed "
             + "and are in fact not duplicate titles.  These will not get "
             + "reported as duplicates."))
+    arg_parser.add_argument(
+        "--fuzzytitles", required=False, action="store_true",
+        help=(
+            "Flag new pubs with titles that are very similar to, but not "
+            + "the same as, a pub we already have. Flagged pubs are listed "
+            + "as possible duplicates on the curation page; they are not "
+            + "merged. Requires rapidfuzz."))
     arg_parser.add_argument(
         "--excludesearches", required = False,
         help=(
@@ -142,16 +164,62 @@ def get_args():
 
     args = arg_parser.parse_args()
 
-    # split comma separated list of sources
-    args.sources = args.sources.split(",")
+    parse_sources(args, arg_parser)
+    check_fuzzy_titles(args, arg_parser)
+    known_pub_db.check_known_pubs_paths(args, arg_parser)
 
     return args
 
 
-def get_pub_proxy_url(pub_url, proxy, proxy_separator):
+def check_fuzzy_titles(args, arg_parser):
+    """--fuzzytitles can only be used if rapidfuzz is installed."""
+    if args.fuzzytitles and not pub_match.process:
+        arg_parser.error("--fuzzytitles requires rapidfuzz to be installed.")
+
+    return None
+
+
+def parse_sources(args, arg_parser):
+    """Replace the comma separated --sources list with a frozenset of
+    alert source names, or with None if all sources were asked for.
+
+    Unknown sources are reported as argument errors.
+    """
+    sources = frozenset(args.sources.split(","))
+    if "all" in sources:
+        sources = None
+    else:
+        unknown = sources.difference(alert_sources.ALERT_SOURCES)
+        if unknown:
+            arg_parser.error(
+                "Unknown alert source(s) in --sources: {0}".format(
+                    ", ".join(sorted(unknown))))
+    args.sources = sources
+
+    return None
+
+
+def parse_alert_date(date_text):
+    """Check a --since or --before argument is a DD-Mmm-YYYY date.
+
+    The text is returned as is, as that is the format IMAP searches use.
+    """
+    try:
+        datetime.datetime.strptime(date_text, ALERT_DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "'{0}' is not a DD-Mmm-YYYY date.".format(date_text))
+    return date_text
+
+
+def get_pub_proxy_url(pub_url, proxy, proxy_separator_translation):
     """Given the URL to a pub in it's native habitat, return a URL that links
     to the pub through the given proxy.
 
+    proxy_separator_translation is a str.translate table (from
+    PROXY_SEPARATOR_TRANSLATIONS) that maps dots in the host name to the
+    proxy's separator.
+
     If the pub's URL is say:
       "https://thisandthat.org/paper/etc"
     This this function will return
@@ -159,13 +227,21 @@ def get_pub_proxy_url(pub_url, proxy, proxy_separator):
       or
       "https://thisandthat-org." + proxy + "/paper/etc"
 
+    Any user info or port in the URL is left in place around the proxied
+    host name.
+
     if the pub does not have a URL, then None is returned.
     """
     if pub_url:
-        url_parts = pub_url.split("/")
-        url_parts[2] = url_parts[2].replace(".", proxy_separator)
-        proxy_url = (
-            "/".join(url_parts[0:3]) + proxy + "/" + "/".join(url_parts[3:]))
+        url_parts = urllib.parse.urlsplit(pub_url)
+        user_info, at_sign, host_port = url_parts.netloc.rpartition("@")
+        host, colon, port = host_port.partition(":")
+        proxy_netloc = (
+            user_info + at_sign
+            + host.translate(proxy_separator_translation) + proxy
+            + colon + port)
+        proxy_url = urllib.parse.urlunsplit(
+            url_parts._replace(netloc=proxy_netloc))
     else:
         proxy_url = None
 
@@ -212,7 +288,7 @@ def pub_match_link_list_html(pub_match):
              + 'See pub via proxy</a></li>').format(
                  get_pub_proxy_url(
                      pub_url, args.proxy,
-                     PROXY_SEPARATOR_OPTIONS[args.proxyseparator])))
+                     PROXY_SEPARATOR_TRANSLATIONS[args.proxyseparator])))
 
     # Search for pub in several places
     pub_title = pub_match.get_pub_title()
@@ -269,8 +345,8 @@ def match_pubs(command_line_args):
     # read in the list of exclude searches; will be empty if there are none
     exclude_db = alert.ExcludeAlertsDB(args.excludesearches)
 
-    # Get all alerts
-    pub_alerts = []
+    # Get all alerts, one chunk per source.
+    pub_alert_chunks = []
 
     # Open connection to alert source.
     email_connection = None
@@ -279,9 +355,10 @@ def match_pubs(command_line_args):
             account=args.email, imaphost=args.imaphost)
 
     # go through each source and pull in all alerts.
-    source_ids = args.sources
-    if source_ids[0] == 'all':
-        source_ids = alert_sources.ALERT_SOURCES
+    # (Always in the same order, no matter how --sources listed them.)
+    source_ids = [
+        source_id for source_id in alert_sources.ALERT_SOURCES
+        if args.sources is None or source_id in args.sources]
 
     for source_id in source_ids:
         source_module = alert_sources.get_alert_source_module(source_id)
@@ -292,34 +369,34 @@ def match_pubs(command_line_args):
         connection.module = source_module
 
         # get every pub_alert from that source
-        pub_alerts += (
+        pub_alert_chunks.append(
             connection.get_pub_alerts(
                 connection.module.SENDERS, mailbox=args.mailbox,
                 since=args.since, before=args.before))
+    pub_alerts = list(itertools.chain.from_iterable(pub_alert_chunks))
 
     # Identify which pub_alerts are exclude alerts.  Label as such
     for pa in pub_alerts:
         pa.alert.exclude = exclude_db.is_an_exclude_alert(pa.alert)
 
-    ok_dup_titles = []    # List of titles that it's ok to have duplicates of.
+    ok_dup_titles = frozenset()  # Titles that it's ok to have duplicates of.
     if command_line_args.okduplicatetitles:
-        dup_titles_file = open(command_line_args.okduplicatetitles, 'r')
-        for title in dup_titles_file:
-            ok_dup_titles.append(title)
-        dup_titles_file.close()
+        with open(command_line_args.okduplicatetitles, 'r') as dup_titles_file:
+            ok_dup_titles = frozenset(
+                title.strip() for title in dup_titles_file if title.strip())
 
     # now have library, a list of pubs we have seen before, and new pub alerts
     # to match against each other.  Create a matchup DB.
     pub_matchups = pub_match.PubMatchDB(
         pub_library=input_lib, pub_alerts=pub_alerts,
-        known_pubs_db=known_pubs_db, ok_dup_titles=ok_dup_titles)
+        known_pubs_db=known_pubs_db, ok_dup_titles=ok_dup_titles,
+        fuzzy_titles=command_line_args.fuzzytitles)
 
     # Print out any matchups that have new pub_alerts
     curation_page = open(command_line_args.curationpage, 'w')
     curation_page.write(html_report.gen_header())
-    curation_page.write(
-        pub_matchups.matchups_with_pub_alerts_to_html(
-            exclude_db, pub_match_link_list_html))
+    pub_matchups.write_matchups_with_pub_alerts_html(
+        exclude_db, pub_match_link_list_html, curation_page.write)
     curation_page.write(html_report.gen_footer())
     curation_page.close()
 
@@ -6,18 +6,89 @@
 """
 
 import bisect
+import io
+import operator
+import re
 import sys
 
+try:
+    # Optional.  Only needed to look for possible duplicate titles.
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None
+
 import email_alert_gs
 import known_pub_db
 import publication
 
+# Minimum rapidfuzz similarity (0-100) for two canonical titles to be
+# reported as possible duplicates, if their first authors also match.
+FUZZY_TITLE_MIN_SCORE = 95
+
+# How many of the most similar titles to check for a first author match.
+FUZZY_TITLE_MAX_CANDIDATES = 5
+
+# Numbers and roman numerals in a title.  "...: 2018 update" and
+# "...: 2024 update", or "..., part I" and "..., part II", are nearly the
+# same title, but different pubs.  Lots of ordinary words ("mix", "dc") and
+# letters ("Hepatitis C") are also roman numerals, so a roman numeral only
+# counts when it follows one of TITLE_NUMBER_WORDS.
+TITLE_WORD_RE = re.compile(r"\w+")
+TITLE_DIGITS_RE = re.compile(r"\d+")
+TITLE_ROMAN_NUMERAL_RE = re.compile(
+    r"m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})")
+TITLE_NUMBER_WORDS = frozenset([
+    "part", "vol", "volume", "book", "chapter", "section", "phase",
+    "stage", "type", "class", "grade"])
+
+# Marks a cached PubMatch value that hasn't been looked up yet.  (None is a
+# valid value.)
+_NOT_CACHED = object()
+
+
+def get_title_numbers(title):
+    """Return the numbers and roman numerals in a (non-canonical) title, in
+    order.
+    """
+    if not title:
+        return []
+    numbers = []
+    prev_word = None
+    for word in TITLE_WORD_RE.findall(title.lower()):
+        if TITLE_DIGITS_RE.fullmatch(word) or (
+                prev_word in TITLE_NUMBER_WORDS
+                and TITLE_ROMAN_NUMERAL_RE.fullmatch(word)):
+            numbers.append(word)
+        prev_word = word
+    return numbers
+
+
+def intern_canonical(canonical):
+    """Return the interned version of a canonical string.
+
+    Canonical titles are used as dict keys and compared over and over.
+    Interning means there is only one copy of each, and that comparing a
+    title with itself is an identity check.
+    """
+    if canonical:
+        canonical = sys.intern(canonical)
+    return canonical
+
 
 class PubMatch(object):
     """A pub match is a collection of pubs that we believe are all the same
     pub.
     """
 
+    # There is one of these for every pub in the library, plus one for every
+    # new pub in the alerts.  Keep them small.
+    __slots__ = (
+        "_lib_pub", "canonical_doi", "canonical_title",
+        "canonical_first_author", "_canon_complete",
+        "_cached_title", "_cached_authors", "_cached_doi", "_cached_url",
+        "_pub_alerts", "_pub_alerts_by_search", "_alert_searches",
+        "_known_pub", "_all_excludes", "_possible_duplicate_of")
+
     def __init__(self, lib_pub=None, pub_alerts=None):
         """Create a pub_match.  Can contain a library pub and/or
         a list of pub_alerts (which each contain a pub). Can't be empty
@@ -25,17 +96,51 @@ class PubMatch(object):
         if not (lib_pub or pub_alerts):
             raise AssertionError("Attempt to create an empty pub_match.")
 
+        self._init_empty()
+        self.set_lib_pub(lib_pub)
+        self.add_pub_alerts(pub_alerts)
+
+        return None
+
+    @classmethod
+    def from_lib_pub(cls, lib_pub):
+        """Create a pub_match for a library pub that has no pub_alerts yet.
+
+        Same as PubMatch(lib_pub=lib_pub), without the checks for an empty
+        pub_match or for pub_alerts.  Used when loading the library, which
+        creates one of these for every pub in it.
+        """
+        pub_match = cls.__new__(cls)
+        pub_match._init_empty()
+        pub_match.set_lib_pub(lib_pub)
+
+        return pub_match
+
+    def _init_empty(self):
+        """Set up a pub_match with no library pub and no pub_alerts.
+
+        Every slot is set here, so __init__ and from_lib_pub can't drift
+        apart.
+        """
         self._lib_pub = None
         self.canonical_doi = None
         self.canonical_title = None
         self.canonical_first_author = None
+        self._canon_complete = False
+        self._clear_cached_pub_info()
 
-        self.set_lib_pub(lib_pub)
         self._pub_alerts = []
+        # Same pub_alerts, in alert search order, for rendering.  Kept
+        # sorted as alerts are added, with the search strings in a parallel
+        # list for bisect.
+        self._pub_alerts_by_search = []
+        self._alert_searches = []
         self._known_pub = None
         # track if all alerts for this pub are exclude alerts.
         self._all_excludes = False
-        self.add_pub_alerts(pub_alerts)
+        # PubMatch with a very similar title, if any.  Left for the curator
+        # to decide about.
+        self._possible_duplicate_of = None
 
         return None
 
@@ -63,9 +168,12 @@ class PubMatch(object):
     def set_lib_pub(self, lib_pub):
         if lib_pub:
             self._lib_pub = lib_pub
+            self._clear_cached_pub_info()
             self.canonical_doi = self._lib_pub.canonical_doi
-            self.canonical_title = self._lib_pub.canonical_title
+            self.canonical_title = intern_canonical(
+                self._lib_pub.canonical_title)
             self.canonical_first_author = self._lib_pub.canonical_first_author
+            self._update_canon_complete()
         return None
 
     def get_lib_pub(self):
@@ -76,49 +184,73 @@ class PubMatch(object):
 
     def add_pub_alert(self, pub_alert):
         """Add a single PubAlert to this matchup's list of pub_alerts."""
+        pub = pub_alert.pub
+        alert = pub_alert.alert
+        doi = pub.canonical_doi
 
         self._pub_alerts.append(pub_alert)
+        # After any alerts with the same search, just like a stable sort.
+        search_i = bisect.bisect_right(self._alert_searches, alert.search)
+        self._alert_searches.insert(search_i, alert.search)
+        self._pub_alerts_by_search.insert(search_i, pub_alert)
+        self._clear_cached_pub_info()
 
         # if matchup doesn't have canonical info yet, add it from alert.
-        # DOI
-        if pub_alert.pub.canonical_doi:
-            if self.canonical_doi:
-                if pub_alert.pub.canonical_doi != self.canonical_doi:
-                    print(
-                        "DOIs disagree for: "
-                        + "{0}".format(self.canonical_title),
-                        file=sys.stderr)
-                    print(
-                        "  DOI 1: {0}".format(self.canonical_doi),
-                        file=sys.stderr)
-                    print(
-                        "  DOI 2: {0}".format(pub_alert.pub.canonical_doi),
-                        file=sys.stderr)
-            else:  # match doesn't yet have a canonical DOI.
-                self.canonical_doi = pub_alert.pub.canonical_doi
-
-        # Title
-        if pub_alert.pub.canonical_title and not self.canonical_title:
-            # Titles are really noisy, don't check that they are the same.
-            # Worried? Don't be. Everything in the pub_alerts list has
-            # already been matched on title or DOI.
-            self.canonical_title = pub_alert.pub.canonical_title
-
-        # first author
-        if pub_alert.pub.canonical_first_author and not (
-                self.canonical_first_author):
-            # First authors are also really noisy.
-            self.canonical_first_author = pub_alert.pub.canonical_first_author
+        # Once it has all of it, the only thing left to check is whether the
+        # alert has a different DOI.
+        if not (self._canon_complete and (
+                not doi or doi == self.canonical_doi)):
+            # DOI
+            if doi:
+                if self.canonical_doi:
+                    if doi != self.canonical_doi:
+                        print(
+                            "DOIs disagree for: "
+                            + "{0}".format(self.canonical_title),
+                            file=sys.stderr)
+                        print(
+                            "  DOI 1: {0}".format(self.canonical_doi),
+                            file=sys.stderr)
+                        print(
+                            "  DOI 2: {0}".format(doi),
+                            file=sys.stderr)
+                else:  # match doesn't yet have a canonical DOI.
+                    self.canonical_doi = doi
+
+            # Title
+            title = pub.canonical_title
+            if title and not self.canonical_title:
+                # Titles are really noisy, don't check that they are the same.
+                # Worried? Don't be. Everything in the pub_alerts list has
+                # already been matched on title or DOI.
+                self.canonical_title = intern_canonical(title)
+
+            # first author
+            first_author = pub.canonical_first_author
+            if first_author and not self.canonical_first_author:
+                # First authors are also really noisy.
+                self.canonical_first_author = first_author
+
+            self._update_canon_complete()
 
         # Track if this pub_match has all exclude alerts.
-        if len(self._pub_alerts) == 1 and pub_alert.alert.exclude:
+        if len(self._pub_alerts) == 1 and alert.exclude:
             # first pub alert, and it's an exclude
             self._all_excludes = True
         else:
-            self._all_excludes = self._all_excludes and pub_alert.alert.exclude
+            self._all_excludes = self._all_excludes and alert.exclude
 
         return self._pub_alerts
 
+    def _update_canon_complete(self):
+        """Note whether this matchup has a canonical DOI, title, and first
+        author.  Once it has all three, alerts can't change them.
+        """
+        self._canon_complete = bool(
+            self.canonical_doi and self.canonical_title
+            and self.canonical_first_author)
+        return None
+
     def add_pub_alerts(self, pub_alerts):
         """Add a list of 0, 1, or more pub_alerts to matchup.
 
@@ -133,14 +265,34 @@ class PubMatch(object):
             self.add_pub_alert(pa)
         return self._pub_alerts
 
+    def set_possible_duplicate_of(self, pub_match):
+        """Note that this pub might be the same pub as the given pub_match.
+        """
+        self._possible_duplicate_of = pub_match
+        return None
+
     def set_known_pub(self, known_pub):
         """Assign a known pub to this match.  This is none if we haven't seen
         the pub before.
         """
         self._known_pub = known_pub
 
+    def _clear_cached_pub_info(self):
+        """Forget the cached title, authors, DOI and URL of this pub.
+
+        They are looked up again the next time they are asked for.  Call
+        this whenever the library pub or pub_alerts change.
+        """
+        self._cached_title = _NOT_CACHED
+        self._cached_authors = _NOT_CACHED
+        self._cached_doi = _NOT_CACHED
+        self._cached_url = _NOT_CACHED
+        return None
+
     def get_pub_title(self):
         """Return the (unmunged) title of the publication."""
+        if self._cached_title is not _NOT_CACHED:
+            return self._cached_title
 
         # Challenge is that we the canonical title, but not the title.
         title = None
@@ -151,10 +303,13 @@ class PubMatch(object):
                 if pa.pub.title:
                     title = pa.pub.title
                     break
+        self._cached_title = title
         return title
 
     def get_pub_authors(self):
         """Return the (unmunged) list of authors of this pub."""
+        if self._cached_authors is not _NOT_CACHED:
+            return self._cached_authors
 
         authors = None
         if self._lib_pub:
@@ -164,10 +319,13 @@ class PubMatch(object):
                 if pa.pub.authors:
                     authors = pa.pub.authors
                     break
+        self._cached_authors = authors
         return authors
 
     def get_pub_doi(self):
         """Return the DOI of this pub."""
+        if self._cached_doi is not _NOT_CACHED:
+            return self._cached_doi
 
         doi = None
         if self._lib_pub:
@@ -177,10 +335,14 @@ class PubMatch(object):
                 if pa.pub.canonical_doi:
                     doi = pa.pub.canonical_doi
                     break
+        self._cached_doi = doi
         return doi
 
     def get_pub_url(self):
         """Return the URL of the publication in it's native location."""
+        if self._cached_url is not _NOT_CACHED:
+            return self._cached_url
+
         if self.is_lib_pub():
             pub_url = self._lib_pub.url
         else:
@@ -189,6 +351,7 @@ class PubMatch(object):
                 if pub_alert.pub.url:
                     pub_url = pub_alert.pub.url
                     break
+        self._cached_url = pub_url
         return pub_url
 
     def get_first_alert_search(self):
@@ -197,45 +360,47 @@ class PubMatch(object):
         """
         return self._pub_alerts[0].alert.search
 
-    def to_html(self, exclude_db):
-        """Render the PubMatch in HTML."""
-
-        output = []
+    def to_html(self, exclude_db, write):
+        """Render the PubMatch in HTML.
 
+        The HTML is passed, one line at a time, to write (typically the
+        write method of a file or io.StringIO).
+        """
         # describe the pub.
-        output.append('<p style="font-size: 140%;"><strong>')
-        output.append('{0}'.format(self.get_pub_title()))
-        output.append('</strong></p>')
-        output.append('<p>{0}</p>'.format(self.get_pub_authors()))
+        write('<p style="font-size: 140%;"><strong>\n')
+        write('{0}\n'.format(self.get_pub_title()))
+        write('</strong></p>\n')
+        write('<p>{0}</p>\n'.format(self.get_pub_authors()))
+        if self._possible_duplicate_of:
+            write(
+                '<p style="background-color: #ffddaa;">'
+                + 'Possible duplicate of: <em>{0}</em></p>\n'.format(
+                    self._possible_duplicate_of.get_pub_title()))
 
         # describe the pub_alerts
         if len(self._pub_alerts) > 0:
-            output.append('<p>Alerts for this pub:</p>')
-            output.append('<ol>')
+            write('<p>Alerts for this pub:</p>\n')
+            write('<ol>\n')
             # Want pub_alerts to always come out in the same order.
             # Helps with diff'ing.
-            pub_alerts_sorted = sorted(
-                self._pub_alerts,
-                key=lambda pub_alert: pub_alert.alert.search)
-            for pa in pub_alerts_sorted:
+            for pa in self._pub_alerts_by_search:
                 if exclude_db.is_an_exclude_alert(pa.alert):
                     li_style = ' style="background-color: yellow;"'
                 else:
                     li_style = ''
-                output.append(
-                    '<li {0}><strong> {1} </strong>'.format(
+                write(
+                    '<li {0}><strong> {1} </strong>\n'.format(
                         li_style,
                         pa.alert.get_search_text_with_alert_source()))
-                output.append('<ul>')
+                write('<ul>\n')
                 if pa.pub.ref:
-                    output.append(
-                        '<ul><li> {0}</li></ul>'.format(pa.pub.ref))
+                    write('<ul><li> {0}</li></ul>\n'.format(pa.pub.ref))
                 if pa.text_from_pub:
-                    output.append(
-                        '<ul><li> {0}</li></ul>'.format(pa.text_from_pub))
-                output.append('</ul></li>')
-            output.append('</ol>')
-        return '\n'.join(output)
+                    write(
+                        '<ul><li> {0}</li></ul>\n'.format(pa.text_from_pub))
+                write('</ul></li>\n')
+            write('</ol>\n')
+        return None
 
 
 class PubMatchDB(object):
@@ -243,62 +408,133 @@ class PubMatchDB(object):
     individual PubMatch objects.
     """
 
+    __slots__ = (
+        "_by_canonical_doi", "_by_canonical_title", "canonical_titles_sorted",
+        "_pms_with_alerts", "_warnings", "_ok_dups_by_canonical_title",
+        "_fuzzy_titles")
+
     def __init__(
             self, pub_library, pub_alerts, known_pubs_db=None,
-            ok_dup_titles=None):
+            ok_dup_titles=None, fuzzy_titles=False):
         """Create a PubMatch database, given an input publication library, an
         optional db of known pubs, and a list of new pub alerts.
+
+        If fuzzy_titles is true, then new pubs with titles very similar to a
+        pub we already have are flagged as possible duplicates of it.  This
+        requires rapidfuzz.
         """
-        # Provide quick access via title and DOI
-        self._by_canonical_doi = {}
-        self._by_canonical_title = {}
-        self.canonical_titles_sorted = []     # use bisect with this.
+        if fuzzy_titles and not process:
+            raise ImportError(
+                "Looking for similar titles requires rapidfuzz.")
+        self._fuzzy_titles = fuzzy_titles
+        # PubMatches that have at least one pub alert.
+        self._pms_with_alerts = set()
+        # Warnings are collected here and written out all at once.
+        self._warnings = []
 
         # Procss duplicate pub titles that should be ignored.
-        self._ok_dups_by_canonical_title = set()
-        if ok_dup_titles:
-            for ok_title in ok_dup_titles:
-                self._ok_dups_by_canonical_title.add(
-                    publication.to_canonical(ok_title))
-
-        # Create PubMatch's for every entry in the library.
-        for lib_pub in pub_library.get_pubs():
-            self.add_pub_match(PubMatch(lib_pub=lib_pub))
+        # Canonicalized once here, so lookups never re-canonicalize.
+        to_canonical = publication.to_canonical
+        self._ok_dups_by_canonical_title = frozenset(
+            to_canonical(ok_title) for ok_title in ok_dup_titles or ())
+
+        # Create PubMatch's for every entry in the library, and provide
+        # quick access to them via title and DOI.  If a DOI or title is in
+        # the library more than once, the last pub with it wins.
+        lib_pub_matches = [
+            PubMatch.from_lib_pub(lib_pub)
+            for lib_pub in pub_library.get_pubs()]
+        self._by_canonical_doi = {
+            pm.canonical_doi: pm
+            for pm in lib_pub_matches if pm.canonical_doi}
+        self._by_canonical_title = {
+            pm.canonical_title: pm
+            for pm in lib_pub_matches if pm.canonical_title}
+        # use bisect with this.
+        self.canonical_titles_sorted = sorted(self._by_canonical_title)
+        self.warn_about_library_dups(lib_pub_matches)
 
         # walk through pub_alerts, adding them to exising PubMatch's or
         # creating new ones when needed.
         self.add_pub_alerts(pub_alerts)
         if known_pubs_db:
             self.add_known_pub_info(known_pubs_db)
+        self.flush_warnings()
+
+        return None
+
+    def flush_warnings(self):
+        """Write any warnings collected so far to stderr, in one write."""
+        if self._warnings:
+            sys.stderr.write("".join(self._warnings))
+            self._warnings = []
+        return None
+
+    def warn_about_library_dups(self, lib_pub_matches):
+        """Warn about every DOI and title that is in the given list of
+        library PubMatches more than once, in library order.
+
+        Titles in the OK duplicate titles list are not warned about.
+        Warnings are held until flush_warnings is called.
+        """
+        n_dois = sum(1 for pm in lib_pub_matches if pm.canonical_doi)
+        n_titles = sum(1 for pm in lib_pub_matches if pm.canonical_title)
+        if (n_dois == len(self._by_canonical_doi)
+                and n_titles == len(self._by_canonical_title)):
+            return None                   # No duplicates; the usual case.
+
+        dois_seen = set()
+        titles_seen = set()
+        for pm in lib_pub_matches:
+            doi = pm.canonical_doi
+            if doi:
+                if doi in dois_seen:
+                    self._warnings.append(
+                        ("Warning: DOI: {0} in library more than once.\n"
+                         + "  title: {1}\n\n").format(
+                             doi, pm._lib_pub.title))
+                dois_seen.add(doi)
+            title = pm.canonical_title
+            if title:
+                if (title in titles_seen
+                        and title not in self._ok_dups_by_canonical_title):
+                    self._warnings.append(
+                        ("Warning: Title in library more than once.\n"
+                         + "  title: {0}\n\n").format(pm._lib_pub.title))
+                titles_seen.add(title)
 
         return None
 
     def add_pub_match(self, pub_match):
-        """Add a PubMatch entry to the DB."""
-        if pub_match.canonical_doi:
-            if pub_match.canonical_doi in self._by_canonical_doi:
-                print(
-                    "Warning: DOI: {0} in library more than once.".format(
-                        pub_match.canonical_doi),
-                    file=sys.stderr)
-                print(
-                    "  title: {0}\n".format(pub_match._lib_pub.title),
-                    file=sys.stderr)
-            self._by_canonical_doi[pub_match.canonical_doi] = pub_match
-
-        if pub_match.canonical_title:
-            if (pub_match.canonical_title in self._by_canonical_title
-                    and pub_match.canonical_title
-                    not in self._ok_dups_by_canonical_title):
-                print(
-                    "Warning: Title in library more than once.",
-                    file=sys.stderr)
-                print(
-                    "  title: {0}\n".format(pub_match._lib_pub.title),
-                    file=sys.stderr)
-            self._by_canonical_title[pub_match.canonical_title] = pub_match
-            bisect.insort(
-                self.canonical_titles_sorted, pub_match.canonical_title)
+        """Add a PubMatch entry to the DB.
+
+        If a DOI or title is already in the DB, the new PubMatch replaces the
+        old one for it, and a warning is issued.  Warnings are held until
+        flush_warnings is called.
+        """
+        doi = pub_match.canonical_doi
+        if doi:
+            if self._by_canonical_doi.setdefault(doi, pub_match) is not (
+                    pub_match):
+                self._warnings.append(
+                    ("Warning: DOI: {0} in library more than once.\n"
+                     + "  title: {1}\n\n").format(
+                         doi, pub_match._lib_pub.title))
+                self._by_canonical_doi[doi] = pub_match
+
+        title = pub_match.canonical_title
+        if title:
+            if self._by_canonical_title.setdefault(title, pub_match) is not (
+                    pub_match):
+                if title not in self._ok_dups_by_canonical_title:
+                    self._warnings.append(
+                        ("Warning: Title in library more than once.\n"
+                         + "  title: {0}\n\n").format(
+                             pub_match._lib_pub.title))
+                self._by_canonical_title[title] = pub_match
+            # Each title is only listed once in canonical_titles_sorted.
+            else:
+                bisect.insort(self.canonical_titles_sorted, title)
 
         return None
 
@@ -306,14 +542,25 @@ class PubMatchDB(object):
         """Add list of pub_alerts: add them to exising PubMatch's or
         create new ones when needed.
         """
+        by_canonical_doi = self._by_canonical_doi
+        by_canonical_title = self._by_canonical_title
+        pms_with_alerts = self._pms_with_alerts
         for pa in pub_alerts:
+            pub = pa.pub
+            doi = pub.canonical_doi
+            title = pub.canonical_title
             pub_match = None
-            if pa.pub.canonical_doi:
-                pub_match = self._by_canonical_doi.get(
-                    pa.pub.canonical_doi)
-            if not pub_match and pa.pub.canonical_title:
-                pub_match = self._by_canonical_title.get(
-                    pa.pub.canonical_title)
+            if doi:
+                pub_match = by_canonical_doi.get(doi)
+            if not pub_match and title:
+                pub_match = by_canonical_title.get(title)
+            if pub_match:
+                # Exact DOI or title match; the usual case.  Nothing else
+                # to look for.
+                pub_match.add_pub_alert(pa)
+                pms_with_alerts.add(pub_match)
+                continue
+
             # TODO: need to deal with Google truncate here.
             # Need to search pub match DB for shorter version
             # of papers title
@@ -323,51 +570,99 @@ class PubMatchDB(object):
             # truncated Google title.  Otherwise we'll match is short titles
             # erroneously.
             # Deal with this in high-level else below.
-            if (not pub_match and
-                    publication.is_google_truncated_title(pa.pub.title)):
+            if publication.is_google_truncated_title(pub.title):
                 # title from alert is Google truncated.
                 # Find an item with a longer title
-                full_title_i = bisect.bisect_left(
-                    self.canonical_titles_sorted, pa.pub.canonical_title)
-                if (full_title_i != len(self.canonical_titles_sorted)
-                    and self.canonical_titles_sorted[full_title_i].startswith(
-                        pa.pub.canonical_title)):
-                    pub_match = self._by_canonical_title[
-                        self.canonical_titles_sorted[full_title_i]]
-            elif (not pub_match and
-                    len(pa.pub.title) >=
-                    email_alert_gs.MIN_TRUNCATED_TITLE_LEN):
+                full_title = self.find_title_starting_with(title)
+                if full_title:
+                    pub_match = by_canonical_title[full_title]
+            elif len(pub.title) >= email_alert_gs.MIN_TRUNCATED_TITLE_LEN:
                 # didn't find a match and new alert is not google truncated.
                 # But, the new alert has a long title and could be the same
                 # as a truncated pub title that we already added in this run.
                 # If so, then we already have a pub_match, but it has the
                 # short title in it.
                 # Look for matching, truncated title
+                title_start = title[0:email_alert_gs.MIN_TRUNCATED_TITLE_LEN]
+                titles_sorted = self.canonical_titles_sorted
                 possible_match_i = bisect.bisect_left(
-                    self.canonical_titles_sorted,
-                    pa.pub.canonical_title[
-                        0:email_alert_gs.MIN_TRUNCATED_TITLE_LEN])
-                if (possible_match_i != len(self.canonical_titles_sorted)
-                    and
-                    self.canonical_titles_sorted[possible_match_i].startswith(
-                        pa.pub.canonical_title[
-                            0:email_alert_gs.MIN_TRUNCATED_TITLE_LEN])):
+                    titles_sorted, title_start)
+                if (possible_match_i != len(titles_sorted)
+                        and titles_sorted[possible_match_i].startswith(
+                            title_start)):
                     # we have a match, even though we could be wrong.
-                    pub_match = self._by_canonical_title[
-                        self.canonical_titles_sorted[possible_match_i]]
+                    short_title = titles_sorted[possible_match_i]
+                    pub_match = by_canonical_title[short_title]
                     # update everything to use the long, full title.
-                    del self._by_canonical_title[
-                        self.canonical_titles_sorted[possible_match_i]]
-                    del self.canonical_titles_sorted[possible_match_i]
-                    self._by_canonical_title[pa.pub.canonical_title] = (
-                        pub_match)
-                    bisect.insort(
-                        self.canonical_titles_sorted, pa.pub.canonical_title)
-                    pub_match.canonical_title = pa.pub.canonical_title
+                    # Intern it once, so the keys, the sorted titles and
+                    # the pub_match all hold the same string.
+                    title = intern_canonical(title)
+                    del by_canonical_title[short_title]
+                    by_canonical_title[title] = pub_match
+                    # The full title usually sorts right where the short
+                    # one was.  If so, replace it in place; no shifting.
+                    # It can't sort before anything starting with
+                    # title_start, so only search from there on.
+                    full_title_i = bisect.bisect_left(
+                        titles_sorted, title, possible_match_i)
+                    if (full_title_i == possible_match_i
+                            or full_title_i == possible_match_i + 1):
+                        titles_sorted[possible_match_i] = title
+                    else:
+                        del titles_sorted[possible_match_i]
+                        bisect.insort(titles_sorted, title)
+                    pub_match.canonical_title = title
             if pub_match:
                 pub_match.add_pub_alert(pa)
             else:
-                self.add_pub_match(PubMatch(pub_alerts=[pa]))
+                pub_match = PubMatch(pub_alerts=[pa])
+                if self._fuzzy_titles and title:
+                    # A title that is nearly, but not exactly, the same,
+                    # like "Modelling" vs "Modeling".  Could be the same pub,
+                    # or not.  Let the curator decide.
+                    pub_match.set_possible_duplicate_of(
+                        self.find_fuzzy_title_match(pub))
+                self.add_pub_match(pub_match)
+            pms_with_alerts.add(pub_match)
+        self.flush_warnings()
+
+        return None
+
+    def find_title_starting_with(self, title_start):
+        """Return the first (in sorted order) canonical title in the DB that
+        starts with the given canonical title_start, or None if there isn't
+        one.
+        """
+        titles_sorted = self.canonical_titles_sorted
+        title_i = bisect.bisect_left(titles_sorted, title_start)
+        if (title_i != len(titles_sorted)
+                and titles_sorted[title_i].startswith(title_start)):
+            return titles_sorted[title_i]
+        return None
+
+    def find_fuzzy_title_match(self, pub):
+        """Given a pub, return the PubMatch with a title that is very
+        similar to the pub's title, has the same first author, and has the
+        same numbers and roman numerals in it.  Return None if there isn't
+        one.
+        """
+        if not pub.canonical_first_author:
+            return None
+
+        candidates = process.extract(
+            pub.canonical_title, self.canonical_titles_sorted,
+            scorer=fuzz.ratio, score_cutoff=FUZZY_TITLE_MIN_SCORE,
+            limit=FUZZY_TITLE_MAX_CANDIDATES)
+        title_numbers = None
+        for canonical_title, score, index in candidates:
+            pub_match = self._by_canonical_title[canonical_title]
+            if pub_match.canonical_first_author != pub.canonical_first_author:
+                continue
+            if title_numbers is None:
+                title_numbers = get_title_numbers(pub.title)
+            if get_title_numbers(pub_match.get_pub_title()) != title_numbers:
+                continue
+            return pub_match
 
         return None
 
@@ -396,19 +691,31 @@ class PubMatchDB(object):
         """Return list of all PubMatches that have alerts.
         The list is in canonical title alphabetical order.
         """
-        matches_w_alerts = []
-
-        for pm in self._by_canonical_title.values():
-            if pm._pub_alerts:
-                matches_w_alerts.append(pm)
+        # Only report matchups that can be found by title.  (A library pub
+        # with a duplicate title can't be.)
+        matches_w_alerts = [
+            pm for pm in self._pms_with_alerts
+            if self._by_canonical_title.get(pm.canonical_title) is pm]
 
         # sort them by canonical title.
         return sorted(
             matches_w_alerts,
-            key=lambda pub_match: pub_match.canonical_title)
+            key=operator.attrgetter("canonical_title"))
 
     def matchups_with_pub_alerts_to_html(
             self, exclude_db, additional_info_callback):
+        """Generate HTML listing all the matchups that have PubAlerts, and
+        return it as a single string.
+
+        See write_matchups_with_pub_alerts_html.
+        """
+        output = io.StringIO()
+        self.write_matchups_with_pub_alerts_html(
+            exclude_db, additional_info_callback, output.write)
+        return output.getvalue()
+
+    def write_matchups_with_pub_alerts_html(
+            self, exclude_db, additional_info_callback, write):
         """Generate HTML listing all the matchups that have PubAlerts.
         list them in canonical title order.
 
@@ -417,21 +724,21 @@ class PubMatchDB(object):
         additional_info_callback is a function that expects a PubMatch as an
         argument and is called from this method to generate additional
         information in the generated HTML.
+
+        The HTML is passed, a line or so at a time, to write (typically the
+        write method of the output file), so the whole page is never held in
+        memory.
         """
-        output = []
-        exclude_only_output = []
+        matchups = self.get_matchups_with_alerts_sorted_by_title()
+
+        # Exclude only matchups go at the end.
         known_count = 0
         new_count = 0
-        exclude_only_count = 0
-        for pm in self.get_matchups_with_alerts_sorted_by_title():
+        for pm in matchups:
             if pm._all_excludes:
-                state_text = "Exclude"
-                div_style = "background-color: #ffffee; "
-                exclude_only_count += 1
-                counter = exclude_only_count
-                which_output = exclude_only_output
+                continue
 
-            elif pm.is_known():
+            if pm.is_known():
                 state_text = "Known"
                 div_style = "background-color: #dddddd; "
                 if pm._known_pub:
@@ -450,29 +757,47 @@ class PubMatchDB(object):
                     state_text += " (" + ", ".join(pm._lib_pub.tags) + ")"
                 known_count += 1
                 counter = known_count
-                which_output = output
 
             else:                 # It's a previously unknown pub.
                 state_text = "New"
                 div_style = "background-color: #eeeeff; "
                 new_count += 1
                 counter = new_count
-                which_output = output
-
-            which_output.append(
-                '<div style="' + div_style
-                + 'border: 1px solid #bbbbbb; '
-                + 'margin: 1em 0.5em; '
-                + 'padding-left: 1em; padding-right: 1em;">')
-            which_output.append(
-                '<p style="font-size: 160%;">{0}. {1}</p>'.format(
-                    counter, state_text))
-            which_output.append(pm.to_html(exclude_db))
-
-            # Matchup described; now add additional information
-            which_output += additional_info_callback(pm)
-
-        return '\n'.join(output) + '\n'.join(exclude_only_output)
+
+            self._write_matchup_html(
+                pm, counter, state_text, div_style, exclude_db,
+                additional_info_callback, write)
+
+        exclude_only_count = 0
+        for pm in matchups:
+            if pm._all_excludes:
+                exclude_only_count += 1
+                self._write_matchup_html(
+                    pm, exclude_only_count, "Exclude",
+                    "background-color: #ffffee; ", exclude_db,
+                    additional_info_callback, write)
+
+        return None
+
+    def _write_matchup_html(
+            self, pm, counter, state_text, div_style, exclude_db,
+            additional_info_callback, write):
+        """Write the HTML for a single matchup, in its own div."""
+        write(
+            '<div style="' + div_style
+            + 'border: 1px solid #bbbbbb; '
+            + 'margin: 1em 0.5em; '
+            + 'padding-left: 1em; padding-right: 1em;">\n')
+        write(
+            '<p style="font-size: 160%;">{0}. {1}</p>\n'.format(
+                counter, state_text))
+        pm.to_html(exclude_db, write)
+
+        # Matchup described; now add additional information
+        for line in additional_info_callback(pm):
+            write(line + '\n')
+
+        return None
 
     def get_matchups_without_known_pub(self):
         """Return list of all PubMatches that don't have a known pub.
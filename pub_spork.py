@@ -14,6 +14,7 @@ import alert_sources
 import lib_types
 import report_formats
 import generate_lib_report
+import known_pub_db
 import match_pubs
 
 
@@ -84,12 +85,12 @@ def get_args():
             "Address of --email's IMAP server. For GMail this is "
             + "imap.gmail.com."))
     match_args.add_argument(
-        "--since", required=False,
+        "--since", required=False, type=match_pubs.parse_alert_date,
         help=(
             "Only look at alerts from after this date. "
             + "Format: DD-Mmm-YYYY. Example: 01-Dec-2014."))
     match_args.add_argument(
-        "--before", required=False,
+        "--before", required=False, type=match_pubs.parse_alert_date,
         help=(
             "Optional. Only look at alerts before this date. "
             + "Format: DD-Mmm-YYYY.  Example: 01-Jan-2015."))
@@ -121,16 +122,26 @@ def get_args():
         help=(
             "Path to existing known pubs DB. This is the list of publications "
             + "you have already looked at. Typically generated from the "
-            + "previous PubSpork run. In TSV format."))
+            + "previous PubSpork run. In TSV format, or in Parquet format "
+            + "if the file name ends in .parquet."))
     match_args.add_argument(
         "--knownpubsout", required=False,
-        help="Where to put the new known pubs DB (in TSV format).")
+        help=(
+            "Where to put the new known pubs DB (in TSV format, or in "
+            + "Parquet format if the file name ends in .parquet)."))
     match_args.add_argument(
         "--okduplicatetitles", required=False,
         help=(
             "Text file containing duplicate titles that have been reviewed "
             + "and are in fact not duplicate titles.  These will not get "
             + "reported as duplicates."))
+    match_args.add_argument(
+        "--fuzzytitles", required=False, action="store_true",
+        help=(
+            "Flag new pubs with titles that are very similar to, but not "
+            + "the same as, a pub we already have. Flagged pubs are listed "
+            + "as possible duplicates on the curation page; they are not "
+            + "merged. Requires rapidfuzz."))
     match_args.add_argument(
         "--excludesearches", required = False,
         help=(
@@ -185,11 +196,13 @@ def get_args():
             + "is specified."))
     report_args.add_argument(
         "--entrystartdate", required=False,
+        type=generate_lib_report.parse_entry_date,
         help=(
             "--tagcountdaterange will report on papers with entry dates "
             + "greater than or equal to this date. Example: 2016-12-29. "))
     report_args.add_argument(
         "--entryenddate", required=False,
+        type=generate_lib_report.parse_entry_date,
         help=(
             "--tagcountdaterange will report on papers with entry dates "
             + "less than or equal to this date. Example: 2017-01-29. "))
@@ -209,8 +222,9 @@ def get_args():
     args = arg_parser.parse_args()
 
     if args.match:
-        # split comma separated list of sources
-        args.sources = args.sources.split(",")
+        match_pubs.parse_sources(args, arg_parser)
+        match_pubs.check_fuzzy_titles(args, arg_parser)
+        known_pub_db.check_known_pubs_paths(args, arg_parser)
 
     return args
 
@@ -16,13 +16,24 @@ Pubs can come from
 This would be called an abstract class in C.
 """
 
-import inspect
+import atexit
+import bisect
+import collections
+import datetime
+import functools
+import http.client
+import operator
+import os
+import pickle
 import re
 import ssl
+import string
 import sys
-import urllib.request
+import urllib.error
+import urllib.parse
 
-SSL_CONTEXT = ssl.SSLContext(ssl.PROTOCOL_TLS)
+# Verifies certificates and host names, the same way a browser would.
+SSL_CONTEXT = ssl.create_default_context()
 
 # Some publishers restrict access if you come in as Python
 # Which Publishers?  I don't remember.
@@ -41,8 +52,44 @@ HTTP_HEADERS = {
 
 # Cache any URLs that we have already checked for redirects.  Checking for
 # redirects is expensive. Don't do it more than once for a URL.
+# The cache is kept between runs in REDIRECT_CACHE_PATH.  It is read the
+# first time a redirect is checked, and written when the program exits.
+# URLs that couldn't be checked are only cached for this run, so they get
+# tried again next time.
 
 redirect_cache = {}
+redirect_failures = set()
+redirect_cache_loaded = False
+REDIRECT_CACHE_PATH = os.path.expanduser("~/.pub_spork_redirect_cache.pkl")
+
+# Redirects are followed by hand.  Follow these statuses, as many times as
+# urllib would.
+REDIRECT_STATUSES = frozenset([301, 302, 303, 307, 308])
+MAX_REDIRECTS = 10
+
+# Connections used to check redirects, by (scheme, host).  Kept open so that
+# checking the next URL on the same host doesn't need a new connection.
+keep_alive_connections = {}
+
+# Titles, journals, authors and tags get canonicalized over and over.  Cache
+# this many of the most recent canonical versions.
+CANONICAL_CACHE_SIZE = 131072
+
+# Google Scholar ends truncated titles with this: a non-breaking space and
+# an ellipsis.
+GOOGLE_TRUNCATE = "\u00a0\u2026"
+
+# Everything to_canonical removes.
+NON_CANONICAL_RE = re.compile(r'\W+')
+
+# Does the same thing as NON_CANONICAL_RE and lower() in one pass, for ASCII
+# strings: drops everything that isn't a word character (letters, digits,
+# and _), and lower cases what's left.
+ASCII_CANONICAL_TABLE = str.maketrans({
+    chr(code): (
+        chr(code).lower() if (chr(code).isalnum() or chr(code) == "_")
+        else None)
+    for code in range(128)})
 
 
 class Pub(object):
@@ -52,6 +99,12 @@ class Pub(object):
     sources.
     """
 
+    # Libraries and alerts can have tens of thousands of pubs.
+    __slots__ = (
+        "title", "canonical_title", "canonical_doi", "url", "pub_type",
+        "authors", "canonical_first_author", "year", "tags", "journal_name",
+        "canonical_journal", "ref", "entry_date")
+
     def __init__(self):
         """Create an identified publication.
 
@@ -125,6 +178,12 @@ class PubLibrary(object):
         self._journal_alpha_rank = None
         self.journal_pubs_rank = None
 
+        # All pubs in entry date order, and their entry dates, for bisect.
+        # Built by get_pubs the first time it is asked for an entry date
+        # range.
+        self._pubs_by_entry_date = None
+        self._entry_dates = None
+
         return None
 
     def add_pub(self, pub):
@@ -138,6 +197,27 @@ class PubLibrary(object):
         # not everything has a doi
         if pub.canonical_doi:
             self._by_canonical_doi[pub.canonical_doi] = pub
+        self._pubs_by_entry_date = None
+
+        return None
+
+    def add_pubs(self, pubs):
+        """Add a list of populated publications to the library, all at once.
+
+        Same as calling add_pub on each of them, but the indexes are built in
+        bulk.
+        """
+        if any(not pub.canonical_title for pub in pubs):
+            # everything should have a title
+            raise AssertionError("Pub has empty title")
+        self.all_pubs.extend(pubs)
+        # TODO: This will overwrite anything with a duplicate title.
+        self._by_canonical_title.update(
+            {pub.canonical_title: pub for pub in pubs})
+        # not everything has a doi
+        self._by_canonical_doi.update(
+            {pub.canonical_doi: pub for pub in pubs if pub.canonical_doi})
+        self._pubs_by_entry_date = None
 
         return None
 
@@ -173,21 +253,20 @@ class PubLibrary(object):
         """
 
         # These are replaced by frozensets at the end.
-        by_year = {}          # unordered array of papers from that year
-        by_tag = {}           # value is unordered array of papers w/ tag
-        by_journal = {}       # unordered list of papers in each journal
-
-        sorted_by_journal = []  # sorted by canonical journal name
-
+        # unordered array of papers from that year
+        by_year = collections.defaultdict(list)
+        # value is unordered array of papers w/ tag
+        by_tag = collections.defaultdict(list)
+        # unordered list of papers in each journal
+        by_journal = collections.defaultdict(list)
+
+        only_these_tags = None
         if only_these_tags_path:
             # only pay attention to tags listed in the file.
-            tag_file = open(only_these_tags_path, "r")
-            for tag in tag_file:
-                by_tag[tag.strip()] = []
-            tag_file.close()
-
-        # key is canonical Journal Name; value is alphabetized rank.
-        self._journal_alpha_rank = {}
+            with open(only_these_tags_path, "r") as tag_file:
+                for tag in tag_file:
+                    by_tag[tag.strip()] = []
+            only_these_tags = frozenset(by_tag)
 
         for paper in self.all_pubs:
 
@@ -195,56 +274,60 @@ class PubLibrary(object):
             if paper.year == "unknown":
                 # Fix these when you find them.
                 print("Year UNKNOWN: " + paper.title, file=sys.stderr)
-            if paper.year not in by_year:
-                by_year[paper.year] = []
             by_year[paper.year].append(paper)
 
             # Process tags
-            for tag in paper.tags:
-                if only_these_tags_path:
-                    if tag in by_tag:
-                        by_tag[tag].append(paper)
-                else:
-                    if tag not in by_tag:
-                        by_tag[tag] = []
-                    by_tag[tag].append(paper)
-            if len(paper.tags) == 0:
+            tags = paper.tags
+            if not tags:
                 # should not happen, flag it when it happens.
                 print("Paper missing tags: " + paper.title, file=sys.stderr)
+            elif only_these_tags is None:
+                for tag in tags:
+                    by_tag[tag].append(paper)
+            else:
+                for tag in tags:
+                    if tag in only_these_tags:
+                        by_tag[tag].append(paper)
 
             # Process Journal
             jrnl = paper.canonical_journal
             if jrnl:
-                if jrnl not in by_journal:
-                    by_journal[jrnl] = []
-                    sorted_by_journal.append(jrnl)
                 by_journal[jrnl].append(paper)
 
         # create set versions
-        self._by_year = {}
-        for year in by_year:
-            self._by_year[year] = frozenset(by_year[year])
-        self._by_tag = {}
-        for tag in by_tag:
-            self._by_tag[tag] = frozenset(by_tag[tag])
-        self._by_journal = {}
-        for journal in by_journal:
-            self._by_journal[journal] = frozenset(by_journal[journal])
-
-        # create sorted list of Journal names
-        sorted_by_journal.sort()
-        for idx in range(len(sorted_by_journal)):
-            self._journal_alpha_rank[sorted_by_journal[idx]] = idx
+        self._by_year = {
+            year: frozenset(papers) for year, papers in by_year.items()}
+        self._by_tag = {
+            tag: frozenset(papers) for tag, papers in by_tag.items()}
+        self._by_journal = {
+            journal: frozenset(papers)
+            for journal, papers in by_journal.items()}
+
+        # key is canonical Journal Name; value is alphabetized rank.
+        self._journal_alpha_rank = {
+            journal: idx for idx, journal in enumerate(sorted(by_journal))}
 
         # create list of Journal names sorted by most pubs.
         self.journal_pubs_rank = sorted(
             by_journal.values(),
-            key=lambda jrnl_pubs: "{:09d}{}".format(
-                len(self.all_pubs) - len(jrnl_pubs),
-                jrnl_pubs[0].canonical_journal))
+            key=lambda jrnl_pubs: (
+                -len(jrnl_pubs), jrnl_pubs[0].canonical_journal))
 
         return(None)
 
+    def index_entry_dates(self):
+        """Sort the pubs into entry date order, so get_pubs can bisect
+        entry date ranges.
+        """
+        # Pubs without an entry date are never in an entry date range.
+        self._pubs_by_entry_date = sorted(
+            (paper for paper in self.all_pubs if paper.entry_date),
+            key=operator.attrgetter("entry_date"))
+        self._entry_dates = [
+            paper.entry_date for paper in self._pubs_by_entry_date]
+
+        return None
+
     def get_pubs(
             self,
             tag=None,
@@ -266,27 +349,35 @@ class PubLibrary(object):
             sets.append(self._by_journal[journal])
 
         if len(sets) > 1:
-            selected = sets[0]
-            for restriction in sets[1:]:
-                selected = selected.intersection(restriction)
+            selected = sets[0].intersection(*sets[1:])
         elif len(sets) == 1:
             selected = sets[0]
+        elif start_entry_date or end_entry_date:
+            # Only selecting on dates.  Pull the date range straight out of
+            # the date ordered pubs.
+            if self._pubs_by_entry_date is None:
+                self.index_entry_dates()
+            first_i = 0
+            if start_entry_date:
+                first_i = bisect.bisect_left(
+                    self._entry_dates, start_entry_date)
+            end_i = len(self._entry_dates)
+            if end_entry_date:
+                end_i = bisect.bisect_right(
+                    self._entry_dates, end_entry_date)
+            return frozenset(self._pubs_by_entry_date[first_i:end_i])
         else:  # sets is empty
             selected = frozenset(self.all_pubs)
 
         # apply date selections if present
         if start_entry_date or end_entry_date:
-            match_dates = []
-            for paper in selected:
-                in_so_far = True
-                if start_entry_date and paper.entry_date < start_entry_date:
-                    in_so_far = False
-                elif end_entry_date and paper.entry_date > end_entry_date:
-                    in_so_far = False
-                if in_so_far:
-                    match_dates.append(paper)
-
-            selected = match_dates
+            selected = frozenset(
+                paper for paper in selected
+                if paper.entry_date
+                and not (start_entry_date
+                         and paper.entry_date < start_entry_date)
+                and not (end_entry_date
+                         and paper.entry_date > end_entry_date))
 
         return(selected)
 
@@ -309,9 +400,8 @@ class PubLibrary(object):
         This method is meant to be overridden by subclasses.
         """
         raise NotImplementedError(
-            inspect.currentframe().f_code.co_name
-            + "not implemented by subclass "
-            + self.__class__.__name__)
+            "gen_tag_url not implemented by subclass "
+            + type(self).__name__)
 
     def gen_tag_year_url(self, tag, year):
         """Given a tag and a year, generate a URL thot shows all papers with
@@ -320,9 +410,22 @@ class PubLibrary(object):
         This method is meant to be overridden by subclasses.
         """
         raise NotImplementedError(
-            inspect.currentframe().f_code.co_name
-            + "not implemented by subclass "
-            + self.__class__.__name__)
+            "gen_tag_year_url not implemented by subclass "
+            + type(self).__name__)
+
+
+def to_entry_date(date_text):
+    """Convert a library's entry (date added) timestamp, which starts with
+    YYYY-MM-DD, to a datetime.date.
+
+    Returns None if the timestamp is missing or isn't a date.
+    """
+    if date_text:
+        try:
+            return datetime.date.fromisoformat(date_text[0:10])
+        except ValueError:
+            pass
+    return None
 
 
 def is_google_truncated_title(title_text):
@@ -331,18 +434,21 @@ def is_google_truncated_title(title_text):
 
     These titles end with a non-breaking space and an ellipsis.
     """
-    return title_text.endswith(" …")  # that's a non-breaking space.
+    return title_text.endswith(GOOGLE_TRUNCATE)
 
 
 def trim_google_truncate(title_text):
     """Given a title string, remove the Google truncate string from the end,
     if it is there.  If it isn't there, then return original text.
+
+    The truncate string is sometimes preceded by a regular space.  Remove
+    that too.
     """
     new_title = title_text
-    if title_text.endswith("  …"):
-        new_title = title_text[0:-3]
-    elif title_text.endswith(" …"):
-        new_title = title_text[0:-2]
+    if title_text.endswith(GOOGLE_TRUNCATE):
+        new_title = title_text[0:-len(GOOGLE_TRUNCATE)]
+        if new_title.endswith(" "):
+            new_title = new_title[0:-1]
     return new_title
 
 
@@ -360,10 +466,22 @@ def to_canonical(messy):
     The canonical version of None is None.
     """
     if messy:
-        return re.sub(r'\W+', '', messy).lower()
+        # Canonical strings are often canonicalized again.  They can be
+        # returned as is.
+        if messy.isalnum() and messy.isascii() and messy.islower():
+            return messy
+        return _to_canonical(messy)
     return None
 
 
+@functools.lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def _to_canonical(messy):
+    """Convert a non-empty messy string to a canonical string."""
+    if messy.isascii():
+        return messy.translate(ASCII_CANONICAL_TABLE)
+    return NON_CANONICAL_RE.sub('', messy).lower()
+
+
 def is_canonical_doi(given_doi):
     """Return true if given_doi is already in canonical form.
 
@@ -401,18 +519,17 @@ def to_canonical_doi(given_doi):
     doi_only = given_doi
     if given_doi:
         # DOIs are officially case insensitive.
-        doi_lower = given_doi.lower()
         # if it's a URL (with or without protocol), cut it to just the doi.
         # all DOIs start with 10.
-        doi_start = doi_lower.find("10.")
-        if doi_start == -1 and doi_lower != "":
+        _, doi_start, doi_rest = given_doi.lower().partition("10.")
+        if doi_start:
+            doi_only = doi_start + doi_rest
+        else:
             print(
                 "Warning: DOI column not empty, but not a DOI: '" +
                 given_doi + "'", file=sys.stderr)
             print("  Replacing with the empty string.\n", file=sys.stderr)
             doi_only = ""
-        else:
-            doi_only = doi_lower[doi_start:]
 
     return doi_only
 
@@ -422,24 +539,149 @@ def get_potentially_redirected_url(pub_url):
     Some URLs (like DOIs) redirect to another URL.  Get that URL, or
     return the original URL if it does not redirect.
     """
-    global redirect_cache
     if pub_url:
-        if pub_url in redirect_cache:
-            redirect_url = redirect_cache[pub_url]
-        else:
+        if not redirect_cache_loaded:
+            load_redirect_cache()
+        redirect_url = redirect_cache.get(pub_url)
+        if redirect_url is None:
             try:
-                request = urllib.request.Request(
-                    pub_url, headers=HTTP_HEADERS)
-                url_response = urllib.request.urlopen(
-                    request, context=SSL_CONTEXT)
-                redirect_url = url_response.geturl()  # different if redirected
+                redirect_url = get_final_url(pub_url)
             except BaseException:
                 print("Error: {0}".format(sys.exc_info()[0]), file=sys.stderr)
                 print(
                     "  while processing URL: {0}\n".format(pub_url),
                     file=sys.stderr)
                 redirect_url = pub_url
+                redirect_failures.add(pub_url)
             redirect_cache[pub_url] = redirect_url
         if redirect_url[-12:] == "cookieAbsent":   # Give it up
             redirect_url = pub_url
         return redirect_url
+
+
+def get_final_url(pub_url):
+    """Return the URL that pub_url ends up at, after any redirects.
+
+    Only the headers are needed, so ask for them with HEAD.  Some servers
+    refuse HEAD requests.  For them, fall back to a GET for the first byte.
+    If a server ignores that and sends the whole page, the connection is
+    closed rather than reading the page.
+
+    Redirects are followed by hand, over connections that are kept open
+    between calls, so checking many DOIs doesn't mean a new connection (and
+    TLS handshake) to doi.org for each one.
+    """
+    url = pub_url
+    method = "HEAD"
+    headers = HTTP_HEADERS
+    for _ in range(MAX_REDIRECTS + 1):
+        response = send_keep_alive_request(url, method, headers)
+        location = response.getheader("Location")
+        if response.status in REDIRECT_STATUSES and location:
+            url = urllib.parse.urljoin(url, quote_redirect_url(location))
+        elif response.status < 400:
+            return url
+        elif method == "HEAD":
+            method = "GET"
+            headers = dict(HTTP_HEADERS, Range="bytes=0-0")
+        else:
+            raise urllib.error.HTTPError(
+                url, response.status, response.reason, response.msg, None)
+
+    raise urllib.error.HTTPError(
+        url, response.status, "Too many redirects", response.msg, None)
+
+
+def quote_redirect_url(location):
+    """Quote a redirect's Location header, the same way urllib's
+    HTTPRedirectHandler does.  Servers put spaces and such in them.
+    """
+    url_parts = urllib.parse.urlparse(location)
+    if not url_parts.path and url_parts.netloc:
+        url_parts = url_parts._replace(path="/")
+    return urllib.parse.quote(
+        urllib.parse.urlunparse(url_parts), encoding="iso-8859-1",
+        safe=string.punctuation)
+
+
+def send_keep_alive_request(url, method, headers):
+    """Send a request for url over a kept open connection to its host, and
+    return the response.
+
+    Responses to HEAD requests and partial (ranged) GETs are short.  They
+    are read (and thrown away) so the connection can be used again.  Any
+    other response might be a whole page, so the connection is closed
+    instead.  If the host has closed the connection since it was last used,
+    open a new one and try again.
+    """
+    url_parts = urllib.parse.urlsplit(url)
+    path = url_parts.path or "/"
+    if url_parts.query:
+        path += "?" + url_parts.query
+    connection_key = (url_parts.scheme, url_parts.netloc)
+
+    for attempt in range(2):
+        connection = keep_alive_connections.get(connection_key)
+        if connection is None:
+            if url_parts.scheme == "https":
+                connection = http.client.HTTPSConnection(
+                    url_parts.netloc, context=SSL_CONTEXT)
+            elif url_parts.scheme == "http":
+                connection = http.client.HTTPConnection(url_parts.netloc)
+            else:
+                raise urllib.error.URLError(
+                    "unknown url type: {0}".format(url_parts.scheme))
+            keep_alive_connections[connection_key] = connection
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            if (method == "HEAD"
+                    or response.status == http.HTTPStatus.PARTIAL_CONTENT):
+                response.read()
+            if response.will_close or not response.isclosed():
+                connection.close()
+                del keep_alive_connections[connection_key]
+            return response
+        except (http.client.HTTPException, ConnectionError):
+            connection.close()
+            del keep_alive_connections[connection_key]
+            if attempt:
+                raise
+
+
+def load_redirect_cache(cache_path=REDIRECT_CACHE_PATH):
+    """Add the redirects saved by previous runs to the redirect cache, and
+    arrange for the cache to be saved again when the program exits.
+    """
+    global redirect_cache_loaded
+    redirect_cache_loaded = True
+    try:
+        with open(cache_path, "rb") as cache_in:
+            redirect_cache.update(pickle.load(cache_in))
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, pickle.UnpicklingError) as err:
+        print(
+            "Warning: Could not read redirect cache: {0}".format(err),
+            file=sys.stderr)
+        print("  Starting with an empty cache.\n", file=sys.stderr)
+    atexit.register(save_redirect_cache, cache_path)
+
+    return None
+
+
+def save_redirect_cache(cache_path=REDIRECT_CACHE_PATH):
+    """Save the redirect cache, minus URLs that could not be checked."""
+    saved_redirects = {
+        pub_url: redirect_url
+        for pub_url, redirect_url in redirect_cache.items()
+        if pub_url not in redirect_failures}
+    try:
+        with open(cache_path, "wb") as cache_out:
+            pickle.dump(saved_redirects, cache_out)
+    except OSError as err:
+        print(
+            "Warning: Could not save redirect cache: {0}\n".format(err),
+            file=sys.stderr)
+
+    return None
@@ -1,10 +1,7 @@
 #!/usr/local/bin/python3
 """Defines different report formats."""
 
-import html_report
-import markdown_report
-import bootstrap_buttons_report
-import bootstrap_cards_report
+import importlib
 
 # command line argument settings
 MARKDOWN = "markdown"
@@ -13,30 +10,33 @@ TSV = "tsv"
 BOOTSTRAP_BUTTONS = "bootstrap-buttons"
 BOOTSTRAP_CARDS = "bootstrap-cards"
 
-# mapping from commmand line arg to module that handles it.
+# mapping from commmand line arg to the name of the module that handles it.
+# Only the module for the requested format gets imported.
 FORMAT_MAPPING = {
-    HTML: html_report,
-    MARKDOWN: markdown_report,
-    BOOTSTRAP_BUTTONS: bootstrap_buttons_report,
-    BOOTSTRAP_CARDS: bootstrap_cards_report
+    HTML: "html_report",
+    MARKDOWN: "markdown_report",
+    BOOTSTRAP_BUTTONS: "bootstrap_buttons_report",
+    BOOTSTRAP_CARDS: "bootstrap_cards_report"
     }
 
-FORMATS = list(FORMAT_MAPPING.keys())
+FORMATS = tuple(FORMAT_MAPPING.keys())
+
+# FORMATS doesn't change, so build its text version once.
+if len(FORMATS) > 1:
+    _FORMATS_TEXT = ", ".join(FORMATS[:-1]) + " and " + FORMATS[-1]
+else:
+    _FORMATS_TEXT = FORMATS[0]
 
 
 def get_format_module(format_command_line_arg):
     """Given a command line argument specifying a report format type,
     return the module that generates it.
     """
-    return FORMAT_MAPPING[format_command_line_arg]
+    return importlib.import_module(FORMAT_MAPPING[format_command_line_arg])
 
 
 def get_formats_as_text_list():
-    text_list = ""
-    for report_format in FORMATS[0:-1]:
-        text_list += report_format + ", "
-    if text_list:
-        text_list += " and "
-    text_list += FORMATS[-1]
-
-    return text_list
+    """Return the list of report formats as a comma separated text string,
+    with an "and" between the last two items.
+    """
+    return _FORMATS_TEXT
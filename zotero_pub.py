@@ -45,29 +45,39 @@ ZOTERO_BASE_URL = "https://www.zotero.org"
 # append after user or group to get all papers with a tag.
 ZOTERO_TAG_SUFFIX = ""
 
+# The first column in a Zotero CSV export.  The byte order mark won't go
+# away.
+KEY_COLUMN = '\ufeff"Key"'
+
 
 class Pub(publication.Pub):
     """A publication defined in a Zotero library.
 
     The definition comes from a CSV export of a library.
     """
-    def __init__(self, zot_csv_row):
-        """Create a Zotero publication object from a Zotero CSV entry."""
+    __slots__ = ("zotero_id",)
+
+    def __init__(self, zot_csv_row, column_i):
+        """Create a Zotero publication object from a Zotero CSV entry.
+
+        zot_csv_row is a list of the entry's values, and column_i maps each
+        column name in the CSV header to its index in that list.
+        """
 
         super(Pub, self).__init__()
 
-        self._zot_csv_row = zot_csv_row
-        self.title = self._zot_csv_row["Title"]
+        row = zot_csv_row
+        self.title = row[column_i["Title"]]
         self.canonical_title = publication.to_canonical(self.title)
-        self.zotero_id = self._zot_csv_row['\ufeff"Key"']  # BOM won't go away
-        doi = self._zot_csv_row.get("DOI")
+        self.zotero_id = row[column_i[KEY_COLUMN]]
+        doi = get_optional_value(row, column_i, "DOI")
         if doi:  # should be close to canonical already
             doi = publication.to_canonical_doi(doi)
         self.canonical_doi = doi
-        self.url = self._zot_csv_row["Url"]  # Can be empty
+        self.url = row[column_i["Url"]]  # Can be empty
 
         # Authors is a semicolon separated list of "Last, First I."
-        authors = self._zot_csv_row.get("Author")
+        authors = get_optional_value(row, column_i, "Author")
         if authors:
             self.set_authors(
                 authors,
@@ -78,7 +88,12 @@ class Pub(publication.Pub):
                 file=sys.stderr)
             print("  Does not have any authors.\n", file=sys.stderr)
 
-        self.year = self._zot_csv_row.get("Publication Year")
+        # Years and tags are shared by many pubs, and are used as keys when
+        # preparing reports.  Keep just one copy of each.
+        year = get_optional_value(row, column_i, "Publication Year")
+        if year:
+            year = sys.intern(year)
+        self.year = year
         if not self.year:
             self.year = "unknown"
             print(
@@ -87,22 +102,30 @@ class Pub(publication.Pub):
             print("  Does not have a publication year.\n", file=sys.stderr)
 
         # Tags are a semicolon separated list
-        self.tags = self._zot_csv_row["Manual Tags"].split("; ")
+        self.tags = [
+            sys.intern(tag)
+            for tag in row[column_i["Manual Tags"]].split("; ")]
 
-        if self._zot_csv_row["Item Type"] == "journalArticle":
-            self.journal_name = self._zot_csv_row["Publication Title"]
+        publication_title = row[column_i["Publication Title"]]
+        if row[column_i["Item Type"]] == "journalArticle":
+            self.journal_name = publication_title
             self.canonical_journal = publication.to_canonical(
                 self.journal_name)
         else:
             self.canonical_journal = None
 
         # Entry date in Zotero CSV looks like "date": "2017-09-14 17:48:40"
-        self.entry_date = self._zot_csv_row.get("Date Added")[0:10]
+        self.entry_date = publication.to_entry_date(
+            get_optional_value(row, column_i, "Date Added"))
+        if not self.entry_date:
+            print(
+                "Warning: Zotero Pub '{0}'".format(self.title),
+                file=sys.stderr)
+            print("  Does not have a valid date added.\n", file=sys.stderr)
 
         self.ref = ""
         if not self.journal_name:
-            self.ref = self._zot_csv_row["Publication Title"]
-        year = self._zot_csv_row.get("Publication Year")
+            self.ref = publication_title
         if year:
             self.ref += " (" + year + ")"
 
@@ -148,14 +171,16 @@ class PubLibrary(publication.PubLibrary):
             self.is_user_lib = True
             self._zot_username = url_parts.path.split("/")[1]
 
-        zot_file = open(zot_csv_lib_path, "r")
-        zot_reader = csv.DictReader(zot_file)
-
-        for zot_pub_csv in zot_reader:
-            zot_pub = Pub(zot_pub_csv)
-            self.add_pub(zot_pub)
+        with open(zot_csv_lib_path, "r") as zot_file:
+            zot_reader = csv.reader(zot_file)
+            # Look columns up by name once, not once per pub.
+            column_i = {
+                column: i for i, column in enumerate(next(zot_reader, []))}
+            self.add_pubs([
+                Pub(zot_pub_csv, column_i)
+                for zot_pub_csv in zot_reader
+                if zot_pub_csv])                # skip blank lines
 
-        zot_file.close()
         self.num_pubs = len(self.all_pubs)
 
         return None
@@ -192,6 +217,16 @@ class PubLibrary(publication.PubLibrary):
         return pub_url
 
 
+def get_optional_value(zot_csv_row, column_i, column):
+    """Return the value of a column that might not be in a Zotero CSV
+    export, or None if it isn't.
+    """
+    i = column_i.get(column)
+    if i is None or i >= len(zot_csv_row):
+        return None
+    return zot_csv_row[i]
+
+
 def gen_add_pub_html_link(pub_url):
     """Given the URL of a publication, generate a link to add that pub to
     Zotero.